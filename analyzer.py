@@ -1,6 +1,9 @@
 import argparse
-import json
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use("Agg")  # Plots are only saved to files, so the non-interactive backend is enough
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 from typing import List, Tuple, Set
 import shutil
@@ -9,6 +12,11 @@ from github.GithubException import UnknownObjectException, BadCredentialsExcepti
 from jira_parser import JiraParser
 import utils
 
+# Below this number of issues, the cost of starting worker processes outweighs the gain from parallel processing.
+__PARALLEL_THRESHOLD = 64
+# Number of issues sent to a worker process at once; amortizes the inter-process communication overhead.
+__CHUNK_SIZE = 32
+
 
 def __parse_arguments():
     arg_parser = argparse.ArgumentParser()
@@ -19,21 +27,20 @@ def __parse_arguments():
     return arg_parser.parse_args()
 
 
-def __collect_issue_summary(project: str, issue: dict, save=True) -> \
+def __collect_issue_summary(project: str, issue: dict, issue_id: int, save_document=False) -> \
         Tuple[str, int, Set[str], Set[str], Set[str], Set[str], Set[str], Set[str], List[str], List[str]]:
     """
 
     :param project: Related project
     :param issue: Issue represented as a dictionary
-    :param save: Whether to save the statistics on hard drive
+    :param issue_id: ID of the issue, already parsed from the name of the issue document
+    :param save_document: Whether to save the summary to Projects/<project>/Summary/<issue_key>.json (legacy layout);
+        the directory should already exist
     :return:
     """
 
     # FIELD 1: issue key
-    issue_key = str(issue["issue_key"])
-
-    # FIELD 2: issue ID; used to increase the efficiency of sorting the data
-    issue_id = int(issue_key.split('-')[1])
+    issue_key = issue["issue_key"]
 
     # Parse Description and Remote Links. Remote links are not different from any other type of URLs,
     # so we will just append them to the description of the issue in order to avoid code duplication.
@@ -41,25 +48,20 @@ def __collect_issue_summary(project: str, issue: dict, save=True) -> \
         [remote_link["url"] for remote_link in issue["remotelinks"]]
     )
 
+    # Comments are appended as well, so that references are extracted from all the texts of the issue at once.
+    # The texts are separated with two tabs, since no reference can be matched across them.
+    text = "\t\t".join([description_and_remote_links] + [comment["body"] for comment in issue["comments"]])
+
     # FIELD 3: unparsed URLs
     # FIELD 4: revision IDs
     # FIELD 5: URLs detected as mailing lists
     # FIELD 6: URLs detected as PDF documents
     # FIELD 7: URLs detected as archive files
     # FIELD 8: Other issues
-    urls, revisions, mailing_lists, pdf_documents, archives, other_issues = \
-        utils.extract_references(description_and_remote_links, project)
-
-    # Parse Comments
-    for comment in issue["comments"]:
-        comment_details = utils.extract_references(comment["body"], project)
-        urls.update(comment_details[0])
-        revisions.update(comment_details[1])
-        mailing_lists.update(comment_details[2])
-        pdf_documents.update(comment_details[3])
-        archives.update(comment_details[4])
-        other_issues.update(comment_details[5])
+    urls, revisions, mailing_lists, pdf_documents, archives, other_issues = utils.extract_references(text, project)
 
+    # Issues usually have only a few links, and a plain loop of set.add is faster for them than building the set in
+    # a batch with set.update or set(list), which pays for creating an intermediate iterator or list.
     for other_issue in issue["issuelinks"]:
         other_issues.add(other_issue["issue_key"])
 
@@ -69,7 +71,7 @@ def __collect_issue_summary(project: str, issue: dict, save=True) -> \
     pull_requests = [str(pr["number"]) for pr in issue["pull_requests"]]
 
     summary = (issue_key,
-               issue_id,
+               issue_id,  # FIELD 2: issue ID; used to increase the efficiency of sorting the data
                urls,
                revisions,
                mailing_lists,
@@ -79,34 +81,94 @@ def __collect_issue_summary(project: str, issue: dict, save=True) -> \
                commits,
                pull_requests)
 
-    if save:
+    if save_document:
         __save_references(project, summary)
     return summary
 
 
-def __collect_issues_summary(project: str, save=True) -> List[
-    Tuple[str, int, Set[str], Set[str], Set[str], Set[str], Set[str], Set[str], List[str], List[str]]]:
+def __list_issue_documents(directory: str) -> List[Tuple[int, str]]:
+    """
+    List paths to the JSON documents inside the directory, sorted by issue IDs. The documents are expected to be named
+    after issue keys (e.g. HADOOP-123.json), so the IDs are parsed from the filenames without loading the documents.
+    :param directory: Directory to list documents from
+    :return: List of tuples of an issue ID and the path to its document
+    """
+    documents = [(int(entry.name[:-len(".json")].rsplit('-', 1)[1]), entry.path)
+                 for entry in os.scandir(directory) if entry.name.endswith(".json")]
+    documents.sort()
+    return documents
+
+
+def __process_issue_file(args: Tuple[str, int, str, bool]) -> \
+        Tuple[str, int, List[str], List[str], List[str], List[str], List[str], List[str], List[str], List[str]]:
+    """
+    Load an issue from the JSON document and collect its summary. Sets of references are converted to sorted lists,
+    so that the summary can be cheaply sent back from a worker process.
+    :param args: Tuple of the project, the issue ID, the path to the issue document and whether to save the summary
+        to its own JSON document
+    :return: Tuple containing data
+    """
+    project, issue_id, path, save_document = args
+    issue = utils.load_json(path)
+    summary = __collect_issue_summary(project, issue, issue_id, save_document)
+    return summary[:2] + tuple(sorted(references) for references in summary[2:8]) + summary[8:]
+
+
+def __collect_issues_summary(project: str, save=True, legacy_layout=False) -> List[
+    Tuple[str, int, List[str], List[str], List[str], List[str], List[str], List[str], List[str], List[str]]]:
     """
     For each Issue inside Projects/<project>/Issues, extract all types of references and return a data type containing
-    all the necessary data
+    all the necessary data. Issues are processed in parallel if there are enough of them.
     :param project: Project to extract references from
-    :param save: Whether to save extracted references to JSON documents
+    :param save: Whether to save extracted references to Projects/<project>/Summary.jsonl, one issue per line
+    :param legacy_layout: Whether to also save extracted references to Projects/<project>/Summary/<issue_key>.json
     :return: List of tuples containing data
     """
     directory = os.path.join("Projects", project, "Issues")
     if not os.path.isdir(directory):
         print("The folder does not exist. Make sure you fetched and parsed at least one issue.")
         return []
-    issues_dir = os.listdir(directory)
-    issues = []
+    documents = __list_issue_documents(directory)
+    save_document = save and legacy_layout
+    if save_document:
+        # Created once here rather than for each saved issue
+        utils.create_dir_if_necessary(os.path.join("Projects", project, "Summary"))
+    args = [(project, issue_id, path, save_document) for issue_id, path in documents]
+
+    if len(documents) < __PARALLEL_THRESHOLD:
+        summary = [__process_issue_file(arg) for arg in args]
+    else:
+        with ProcessPoolExecutor() as executor:
+            summary = list(executor.map(__process_issue_file, args, chunksize=__CHUNK_SIZE))
 
-    for filename in issues_dir:
-        path = os.path.join(directory, filename)
-        with open(path, 'r') as issue_file:
-            issue = json.load(issue_file)
-            summary = __collect_issue_summary(project, issue, save)
-            issues.append(summary)
-    return issues
+    if save:
+        # A single file is written for the whole project instead of a small document for each issue.
+        # The issues are kept in the order of their IDs, which __generate_statistics relies on.
+        path = os.path.join("Projects", project, "Summary.jsonl")
+        utils.save_as_jsonl([__summary_as_dict(issue_summary) for issue_summary in summary], path)
+    return summary
+
+
+def __summary_as_dict(issue_summary: Tuple[
+    str, int, Set[str], Set[str], Set[str], Set[str], Set[str], Set[str], List[str], List[str]
+]) -> dict:
+    """
+    Convert the summary of an issue to a dictionary to be saved in JSON format.
+    :param issue_summary: Data type describing necessary data
+    :return: Dictionary with the fields of the summary
+    """
+    return {
+        "issue_key": issue_summary[0],
+        "issue_id": issue_summary[1],
+        "urls": issue_summary[2],
+        "revisions": issue_summary[3],
+        "mailing_lists": issue_summary[4],
+        "pdf_documents": issue_summary[5],
+        "archives": issue_summary[6],
+        "other_issues": issue_summary[7],
+        "commits": issue_summary[8],
+        "pull_requests": issue_summary[9]
+    }
 
 
 def __save_references(project: str,
@@ -114,29 +176,45 @@ def __save_references(project: str,
                           str, int, Set[str], Set[str], Set[str], Set[str], Set[str], Set[str], List[str], List[str]
                       ]) -> None:
     """
-    Save references for an issue in JSON format.
+    Save references for an issue in JSON format (legacy layout). The directory Projects/<project>/Summary should already
+    exist.
     :param project: Project to write references for
     :param issue_summary: Data type describing necessary data
     :return: None
     """
     summary_dir = os.path.join("Projects", project, "Summary")
-    if not os.path.isdir(summary_dir):
-        os.mkdir(summary_dir)
-
-    issue_dict = {
-        "issue_key": issue_summary[0],
-        "issue_id": issue_summary[1],
-        "urls": list(issue_summary[2]),
-        "revisions": list(issue_summary[3]),
-        "mailing_lists": list(issue_summary[4]),
-        "pdf_documents": list(issue_summary[5]),
-        "archives": list(issue_summary[6]),
-        "other_issues": list(issue_summary[7]),
-        "commits": issue_summary[8],
-        "pull_requests": issue_summary[9]
-    }
     path = os.path.join(summary_dir, issue_summary[0] + ".json")
-    utils.save_as_json(issue_dict, path)
+    utils.save_as_json(__summary_as_dict(issue_summary), path)
+
+
+def __block_statistics(counts: np.ndarray, block_size: int) -> np.ndarray:
+    """
+    Sum up the numbers of references in blocks of issues.
+    :param counts: Array of shape (number of issues, number of reference types) with the numbers of references
+    :param block_size: Number of issues in a block
+    :return: Array of shape (number of blocks, number of reference types + 2). Each row contains the block description
+    (e.g. 100 means block 1-100), the total number of references in the block, and the number of references of each type
+    """
+    # All blocks are summed up in a single pass, without padding or copying the counts. The last block may be shorter.
+    block_counts = np.add.reduceat(counts, np.arange(0, len(counts), block_size), axis=0, dtype=np.int64)
+
+    blocks = np.arange(1, len(block_counts) + 1, dtype=np.int64) * block_size
+    totals = block_counts.sum(axis=1)
+    return np.column_stack((blocks, totals, block_counts))
+
+
+def __load_summary(project: str) -> List[dict]:
+    """
+    Load the references of all issues saved by __collect_issues_summary. If Projects/<project>/Summary.jsonl does not
+    exist, the references are loaded from the documents in Projects/<project>/Summary saved in the legacy layout.
+    :param project: Project to load references for
+    :return: List of dictionaries with the references of each issue, sorted by issue IDs
+    """
+    path = os.path.join("Projects", project, "Summary.jsonl")
+    if os.path.isfile(path):
+        return utils.load_jsonl(path)
+    summary_directory = os.path.join("Projects", project, "Summary")
+    return [utils.load_json(path) for _, path in __list_issue_documents(summary_directory)]
 
 
 def __generate_statistics(project: str) -> List[Tuple[int, int, int, int, int, int, int, int, int, int]]:
@@ -156,76 +234,33 @@ def __generate_statistics(project: str) -> List[Tuple[int, int, int, int, int, i
         9. Number of commits
         10. Number of pull requests
     """
-    issues = []
-    summary_directory = os.path.join("Projects", project, "Summary")
-
-    for filename in os.listdir(summary_directory):
-        path = os.path.join(summary_directory, filename)
-        with open(path, 'r') as file:
-            data = json.load(file)
-            issues.append(
-                (str(data["issue_key"]),
-                 int(data["issue_id"]),
-                 list(data["urls"]),
-                 list(data["revisions"]),
-                 list(data["mailing_lists"]),
-                 list(data["pdf_documents"]),
-                 list(data["archives"]),
-                 list(data["other_issues"]),
-                 data["commits"],
-                 data["pull_requests"])
-            )
-    issues = sorted(issues, key=lambda x: x[1])
+    summary = __load_summary(project)
+
+    # Only the number of references of each type is needed, so it is written straight into a preallocated array instead
+    # of keeping the references themselves. The columns are ordered as the corresponding fields of the statistics.
+    # Since the issues are saved in the order of their IDs, the array does not have to be sorted.
+    counts = np.empty((len(summary), 8), dtype=np.int32)
+    for idx, data in enumerate(summary):
+        counts[idx] = (len(data["revisions"]),
+                       len(data["mailing_lists"]),
+                       len(data["pdf_documents"]),
+                       len(data["archives"]),
+                       len(data["other_issues"]),
+                       len(data["urls"]),
+                       len(data["commits"]),
+                       len(data["pull_requests"]))
 
     # Since the number of references in each issue can be very little, it makes sense to combine them in blocks of 100
     # in order to have a better overview of the development of the project.
-    blocks = []
-    block_size = 100
-    block_idx = 0
-    while True:
-        start_idx = block_idx * block_size
-        block = issues[start_idx:start_idx + block_size]
-        if len(block) == 0:
-            break
-        blocks.append(block)
-        block_idx += 1
-
-    # Now it's time to collect statistics
-    block_idx = 1
-    statistics = []
-    for block in blocks:
-        total = 0
-        revisions = 0
-        mailing_lists = 0
-        pdf_documents = 0
-        archives = 0
-        other_issues = 0
-        other_urls = 0
-        commits = 0
-        pull_requests = 0
-        for issue in block:
-            revisions += len(issue[3])
-            mailing_lists += len(issue[4])
-            pdf_documents += len(issue[5])
-            archives += len(issue[6])
-            other_issues += len(issue[7])
-            other_urls += len(issue[2])
-            commits += len(issue[8])
-            pull_requests += len(issue[9])
-            for i in range(2, 10):
-                total += len(issue[i])
-        statistics.append(
-            (block_idx * 100, total, revisions, mailing_lists, pdf_documents, archives, other_issues, other_urls,
-             commits, pull_requests))
-        block_idx += 1
-    return statistics
+    statistics = __block_statistics(counts, 100)
+    return [tuple(block_statistics) for block_statistics in statistics.tolist()]
 
 
 def __make_plot(project: str, plots_dir: str,
                 statistics: List[Tuple[int, int, int, int, int, int, int, int, int]], blocks: List[int],
-                param_idx: int, param_title: str) -> None:
+                param_idx: int, param_title: str, figure: plt.Figure, axes: plt.Axes) -> None:
     """
-    Make a plot for the statistics provided.
+    Make a plot for the statistics provided. The figure is reused between plots, so the axes are cleared first.
     :param project: Project name
     :param plots_dir: Directory where to save the plot
     :param statistics: List of tuples representing generated statistics with the following fields:
@@ -242,19 +277,21 @@ def __make_plot(project: str, plots_dir: str,
     :param blocks: List of 100-based values representing blocks (100 = block 1, 300 = block 3, etc.)
     :param param_idx: Index of the parameter to make the plot for
     :param param_title: Name of the parameter to make the plot for
+    :param figure: Figure to draw the plot on
+    :param axes: Axes of the figure
     :return: None
     """
     x = blocks
     y = [param[param_idx] for param in statistics]
-    plt.plot(x, y)
-    plt.xlabel("Issue IDs")
-    plt.ylabel("Frequency of {}".format(param_title))
-    plt.title("Changes in frequency of {} through the evolution of the project {}".format(param_title, project))
+    axes.clear()
+    axes.plot(x, y)
+    axes.set_xlabel("Issue IDs")
+    axes.set_ylabel("Frequency of {}".format(param_title))
+    axes.set_title("Changes in frequency of {} through the evolution of the project {}".format(param_title, project))
     path = os.path.join(plots_dir, param_title + ".png")
     if os.path.isfile(path):
         os.remove(path)
-    plt.savefig(path, bbox_inches='tight')
-    plt.close()
+    figure.savefig(path, bbox_inches='tight')
 
 
 def __make_plots(project: str, statistics: List[Tuple[int, int, int, int, int, int, int, int, int, int]]) -> None:
@@ -290,8 +327,11 @@ def __make_plots(project: str, statistics: List[Tuple[int, int, int, int, int, i
     shutil.rmtree(plots_dir, ignore_errors=True)
     os.mkdir(plots_dir)
 
+    # A single figure is created for all plots instead of setting up a new one for each plot
+    figure, axes = plt.subplots()
     for t in types:
-        __make_plot(project, plots_dir, statistics, blocks, t[0], t[1])
+        __make_plot(project, plots_dir, statistics, blocks, t[0], t[1], figure, axes)
+    plt.close(figure)
 
 
 if __name__ == "__main__":
@@ -1,20 +1,68 @@
 import errno
 import json
+import mmap
 import os
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library is used as a fallback
+    orjson = None
+
 from .ref_regex import *
 from .latex_transform import *
 
+# JSON documents of at least this size are memory-mapped when parsed with orjson, which avoids copying them into a bytes
+# object. For smaller documents, mapping the file costs more than the copy.
+__MMAP_THRESHOLD = 64 * 1024
+
+MAILING_LIST_KEYS = ("mail-archive", "markmail", "pipermail", "hyperkitty", "hypermail", "mailinglistarchive")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".rar", ".iso", ".gz", ".rz", ".lz", ".7z")
+
+
+def __json_default(obj: object) -> list:
+    # Sets are saved as JSON arrays, so that they don't have to be converted to lists beforehand
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
+
 
 def save_as_json(obj: object, path: str) -> None:
-    with open(path, "w") as file:
-        json.dump(obj, file, indent=2)
+    if orjson:
+        with open(path, "wb") as file:
+            file.write(orjson.dumps(obj, default=__json_default, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, "w") as file:
+            json.dump(obj, file, indent=2, default=__json_default)
 
 
 def load_json(path: str) -> dict:
-    with open(path, "r") as file:
-        loaded = json.load(file)
-    return loaded
+    # Reading the whole file and parsing the buffer at once is considerably faster than parsing from a file object.
+    with open(path, "rb") as file:
+        if orjson and os.fstat(file.fileno()).st_size >= __MMAP_THRESHOLD:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                return orjson.loads(view)
+        content = file.read()
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def save_as_jsonl(objects: List[object], path: str) -> None:
+    # Each object is written on its own line, and all lines are written to the file at once
+    if orjson:
+        option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+        with open(path, "wb") as file:
+            file.write(b"".join(orjson.dumps(obj, default=__json_default, option=option) for obj in objects))
+    else:
+        with open(path, "w") as file:
+            file.write("".join(json.dumps(obj, default=__json_default) + "\n" for obj in objects))
+
+
+def load_jsonl(path: str) -> List[dict]:
+    with open(path, "rb") as file:
+        content = file.read()
+    loads = orjson.loads if orjson else json.loads
+    return [loads(line) for line in content.splitlines() if line]
 
 
 def create_dir_if_necessary(dir_path: str) -> None:
@@ -58,22 +106,44 @@ def extract_references(text: str, project: str) -> Tuple[Set[str], Set[str], Set
         2. Revisions
         3. Mailing lists
         4. PDF documents URLs
+        5. Archive files URLs
+        6. Other issues
     """
-    urls = extract_urls(text, project)
+    urls, mailing_lists, pdf_documents, archives = set(), set(), set(), set()
+    # URLs are classified as soon as they are extracted, instead of splitting the set of URLs with set differences
+    for url in extract_urls(text, project):
+        if is_mailing_list_url(url):
+            mailing_lists.add(url)
+        elif is_pdf_document_url(url):
+            pdf_documents.add(url)
+        elif is_archive_url(url):
+            archives.add(url)
+        else:
+            urls.add(url)
+
     revisions = extract_revisions(text)
+    other_issues = extract_issues(text, project)
 
-    mailing_lists = filter_mailing_list_urls(urls)
-    urls = urls.difference(mailing_lists)
+    return urls, revisions, mailing_lists, pdf_documents, archives, other_issues
 
-    pdf_documents = filter_pdf_document_urls(urls)
-    urls = urls.difference(pdf_documents)
 
-    archives = filter_archives_urls(urls)
-    urls = urls.difference(archives)
+def is_pdf_document_url(url: str) -> bool:
+    return url.endswith(".pdf")
 
-    other_issues = extract_issues(text, project)
 
-    return urls, revisions, mailing_lists, pdf_documents, archives, other_issues
+def is_archive_url(url: str) -> bool:
+    return url.endswith(ARCHIVE_EXTENSIONS)
+
+
+def is_mailing_list_url(url: str, mailing_list_keys=None) -> bool:
+    if not mailing_list_keys:
+        mailing_list_keys = MAILING_LIST_KEYS
+    # A plain loop avoids creating a generator for every URL, which any() would need. For the few default keys, separate
+    # substring searches are also faster than matching all keys at once with an Aho-Corasick automaton.
+    for key in mailing_list_keys:
+        if key in url:
+            return True
+    return False
 
 
 def filter_pdf_document_urls(urls: Set[str]) -> Set[str]:
@@ -83,7 +153,7 @@ def filter_pdf_document_urls(urls: Set[str]) -> Set[str]:
     :param urls: List of URLs to filter PDF documents from
     :return: List of PDF document URLS
     """
-    return set([url for url in urls if url.endswith(".pdf")])
+    return {url for url in urls if is_pdf_document_url(url)}
 
 
 def filter_archives_urls(urls: Set[str]) -> Set[str]:
@@ -92,9 +162,7 @@ def filter_archives_urls(urls: Set[str]) -> Set[str]:
     :param urls:
     :return:
     """
-    return set([url for url in urls if any([url.endswith(ending)
-                                            for ending
-                                            in [".zip", ".tar", ".rar", ".iso", ".gz", ".rz", ".lz", ".7z"]])])
+    return {url for url in urls if is_archive_url(url)}
 
 
 def filter_mailing_list_urls(urls: Set[str], mailing_list_keys=None) -> Set[str]:
@@ -102,9 +170,7 @@ def filter_mailing_list_urls(urls: Set[str], mailing_list_keys=None) -> Set[str]
     Filter URLs leading to mailing lists. This is a very rough implementation and should definitely be improved.
     :param urls: List of URLs to filter mailing lists from
     :param mailing_list_keys: If the URL is a mailing list, any entry from this list should be present in the URL.
-    Otherwise, it checks whether the url contains "mail-archives" or "markmail".
+    Otherwise, it checks whether the url contains any of MAILING_LIST_KEYS.
     :return: List of mailing list URLs
     """
-    if not mailing_list_keys:
-        mailing_list_keys = ["mail-archive", "markmail", "pipermail", "hyperkitty", "hypermail", "mailinglistarchive"]
-    return set([url for url in urls if any(key in url for key in mailing_list_keys)])
+    return {url for url in urls if is_mailing_list_url(url, mailing_list_keys)}
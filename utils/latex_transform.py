@@ -18,23 +18,21 @@ def escape_noformat(string: str, to_latex: bool = True) -> Tuple[str, List[Tuple
         2.2 Content that is intended to replace the flag in the string
     """
     noformats = []
-    noformat_index = 1
-    pattern = re.compile(r"{noformat}((?s).*?){noformat}")
+    pattern = re.compile(r"{noformat}(.*?){noformat}", re.DOTALL)
 
-    while True:
-        noformat = pattern.search(string)
-        if not noformat:
-            break
+    def replace_noformat(noformat) -> str:
         content = noformat.group(0)
-        key = "<<!PDFGENNOFORMAT{}!>>".format(noformat_index)
-        noformat_index += 1
-        string = string.replace(content, key)
+        key = "<<!PDFGENNOFORMAT{}!>>".format(len(noformats) + 1)
 
         if to_latex:
-            content = content.replace(r"{noformat}", r"\begin{spverbatim}", 1)
-            content = content.replace(r"{noformat}", r"\end{spverbatim}\ ", 1)
+            # The content is built from the match itself rather than by searching for the braces again
+            content = r"\begin{spverbatim}" + noformat.group(1) + r"\end{spverbatim}\ "
 
         noformats.append((key, content))
+        return key
+
+    # All noformat blocks are replaced in a single pass over the string
+    string = pattern.sub(replace_noformat, string)
     return string, noformats
 
 
@@ -53,22 +51,16 @@ def escape_listings(string: str, to_latex: bool = True) -> Tuple[str, List[Tuple
         2.2 Content that is intended to replace the flag in the string
     """
     listings = []
-    listing_index = 1
-    pattern = re.compile(r"(({code:((?s).*?)})|({code}))((?s).*?){code}")
+    pattern = re.compile(r"(?:{code:(?P<language>.*?)}|{code})(?P<content>.*?){code}", re.DOTALL)
     # This regex is written with intent to capture the programming language of the code block.
     # The code block starts with either {code:language} or with just {code}.
     # Since each code block ends with {code}, we first have to extract all code blocks that start with a language
     # defined, and only then - blocks without a language, otherwise, we can accidentally extract a text between the end
     # of one block and the start of another block.
 
-    while True:
-        listing = pattern.search(string)
-        if not listing:
-            break
+    def replace_listing(listing) -> str:
         content = listing.group(0)
-        key = "<<!PDFGENCODE{}!>>".format(listing_index)
-        listing_index += 1
-        string = string.replace(content, key)
+        key = "<<!PDFGENCODE{}!>>".format(len(listings) + 1)
         if to_latex:
             # If this value is true, then all code blocks starting with:
             #   {code:lang} are replaced by "\begin{lstlisting}[language=lang]"
@@ -76,15 +68,10 @@ def escape_listings(string: str, to_latex: bool = True) -> Tuple[str, List[Tuple
             # All endings are replaced by "\end{lstlisting}\ ". That extra whitespace is intentional, since in the
             # original text, there is a newline character, and PyLaTeX escapes it with a "\newline" command.
             # It is forbidden to include it after environments which are not fit right into the text.
-            language = re.search(r"{code:((?s).*?)}", content)
-            if language:
-                section = language.group(0)
-                language = language.group(1)
-                lang_spec = r"[language=" + language + r"]" if language.isalpha() else ""
-                content = content.replace(section, r"\begin{lstlisting}" + lang_spec, 1)
-            else:
-                content = content.replace(r"{code}", r"\begin{lstlisting}", 1)
-            content = content.replace(r"{code}", r"\end{lstlisting}\ ", 1)
+            # The listing is built from the groups of the match rather than by searching for the braces again.
+            language = listing.group("language")
+            lang_spec = r"[language=" + language + r"]" if language and language.isalpha() else ""
+            content = r"\begin{lstlisting}" + lang_spec + listing.group("content") + r"\end{lstlisting}\ "
         lines = content.split('\n')
         for line in lines:
             if len(line) > 400:
@@ -95,6 +82,10 @@ def escape_listings(string: str, to_latex: bool = True) -> Tuple[str, List[Tuple
                 content = '\n'.join(line[i:i + 400] for i in range(0, len(line), 400))
         '\n'.join(lines)
         listings.append((key, content))
+        return key
+
+    # All code listings are replaced in a single pass over the string
+    string = pattern.sub(replace_listing, string)
     return string, listings
 
 
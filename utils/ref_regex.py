@@ -1,19 +1,25 @@
+import functools
 import re
 
-from typing import List, Set
+from typing import List, Pattern, Set
 
 # Regex developed by Diego Perini: https://gist.github.com/dperini/729294
 # Was converted from JS to Python using https://regex101.com/
-URL_REGEX = r"(?:(?:(?:https?|ftp):)?\/\/)(?:\S+(?::\S*)?@)?(?:(?!(?:10|127)" \
+# The original user info part "(?:\S+(?::\S*)?@)?" is replaced with the equivalent "(?:\S+@)?": both "\S+" and
+# ":\S*" can match the same characters, which made the regex backtrack quadratically on long words with colons.
+URL_REGEX = r"(?:(?:(?:https?|ftp):)?\/\/)(?:\S+@)?(?:(?!(?:10|127)" \
             r"(?:\.\d{1,3}){3})(?!(?:169\.254|192\.168)(?:\.\d{1,3}){2})(?!172\." \
             r"(?:1[6-9]|2\d|3[0-1])(?:\.\d{1,3}){2})(?:[1-9]\d?|1\d\d|2[01]\d|22[0-3])" \
             r"(?:\.(?:1?\d{1,2}|2[0-4]\d|25[0-5])){2}(?:\.(?:[1-9]\d?|1\d\d|2[0-4]\d|25[0-4]))" \
             r"|(?:(?:[a-z0-9\u00a1-\uffff][a-z0-9\u00a1-\uffff_-]{0,62})?[a-z0-9\u00a1-\uffff]\.)" \
             r"+(?:[a-z\u00a1-\uffff]{2,}\.?))(?::\d{2,5})?(?:[/?#]\S*)?"
-SVN_REVISION_REGEX = r"(?:r|[Rr]ev. |[Rr]evision |[Cc]ommit )([0-9]+)"
+SVN_REVISION_REGEX = r"(?:[Rr]ev(?:. |ision )|r|[Cc]ommit )([0-9]+)"
 GIT_COMMIT_REGEX = r"[0-9a-f]{40}"  # This regex does not always work correctly, so it is decided to ditch it for now.
 NUMBER_REGEX = r"d+"
 
+# Characters replaced with whitespaces by clear_text
+__CHARS_TO_CLEAR = ['\n', '[', ']', '<', '>', '\\', "\""]
+
 url_matcher = re.compile(URL_REGEX)
 svn_revision_matcher = re.compile(SVN_REVISION_REGEX)
 git_commit_matcher = re.compile(GIT_COMMIT_REGEX)
@@ -33,45 +39,42 @@ def extract_urls(text: str, project: str, filter_svn_revisions=True, filter_issu
         return set()
     text = clear_text(text)
     # Some characters still remain in the URL after extraction, although they are not expected to be there, so we
-    # remove them beforehand.
-    urls = set(url_matcher.findall(text))
-    urls = set(
-        filter(
-            lambda url: url.startswith("http"),  # It has been observed that some extracted URLs do not start with http.
-            urls
-        )
-    )
-    urls = set(
-        map(
-            # if a URL ends with '.', '\' or '?', then we should remove that character
-            lambda url: url[:-1] if url[-1] in ['.', '\\', '?', ',', ':', '/'] else url,
-            urls
-        )
-    )
-    urls = set(
-        map(
-            # if a URL ends with ')' and there is no opening bracket '(' in it
-            lambda url: url[:-1] if url[-1] == ')' and '(' not in url else url,
-            urls
-        )
-    )
+    # remove them with trim_url. It has been observed that some extracted URLs do not start with http.
+    urls = {trim_url(url) for url in url_matcher.findall(text) if url.startswith("http")}
     if filter_svn_revisions:
-        urls = set(
-            filter(
-                lambda url: not url.startswith("https://svn.apache.org"),
-                urls
-            )
-        )
+        urls = {url for url in urls if not url.startswith("https://svn.apache.org")}
     if filter_issues:
-        urls = set(
-            filter(
-                lambda url: not extract_issues(url, project),
-                urls
-            )
-        )
+        matcher = issue_matcher(project)
+        urls = {url for url in urls if not matcher.search(url)}
     return urls
 
 
+def trim_url(url: str) -> str:
+    """
+    Remove a redundant character the URL regex may leave at the end of a URL.
+    :param url: URL to trim
+    :return: Trimmed URL
+    """
+    # if a URL ends with '.', '\\' or '?', then we should remove that character
+    if url[-1] in ['.', '\\', '?', ',', ':', '/']:
+        url = url[:-1]
+    # if a URL ends with ')' and there is no opening bracket '(' in it
+    if url[-1] == ')' and '(' not in url:
+        url = url[:-1]
+    return url
+
+
+@functools.lru_cache(maxsize=None)
+def issue_matcher(project_name: str) -> Pattern:
+    """
+    Compile a regex matching issue IDs of the project. It is compiled once per project, since issue IDs are extracted
+    from every title and body of pull requests.
+    :param project_name: Name of the project to match issue IDs
+    :return: Compiled regex
+    """
+    return re.compile(re.escape(project_name) + r"-\d+")
+
+
 def extract_issues(text: str, project_name: str) -> Set[str]:
     """
     Extract all issue IDs from the text. Each issue ID has the form <project_name>-{int_id}.
@@ -81,8 +84,7 @@ def extract_issues(text: str, project_name: str) -> Set[str]:
     """
     if not text:
         return set()
-    issue_matcher = re.compile("{}-{}".format(project_name, r'\d+'))
-    return set(issue_matcher.findall(text))
+    return set(issue_matcher(project_name).findall(text))
 
 
 def extract_revisions(text: str) -> Set[str]:
@@ -127,7 +129,6 @@ def clear_text(text: str) -> str:
     """
     if not text:
         return ""
-    chars_to_remove = [r'\n', '[', ']', '<', '>', '\\', "\""]
-    for char in chars_to_remove:
+    for char in __CHARS_TO_CLEAR:
         text = text.replace(char, ' ')
     return text